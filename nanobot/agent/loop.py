@@ -276,6 +276,11 @@ class AgentLoop:
                 pass  # MCP SDK cancel scope cleanup is noisy but harmless
             self._mcp_stack = None
 
+    async def close(self) -> None:
+        """Close MCP connections and release tool resources (e.g. shared HTTP clients)."""
+        await self.close_mcp()
+        await self.tools.aclose()
+
     def stop(self) -> None:
         """Stop the agent loop."""
         self._running = False
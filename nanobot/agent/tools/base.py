@@ -52,6 +52,10 @@ class Tool(ABC):
         """
         pass
 
+    async def aclose(self) -> None:
+        """Release resources held by the tool (e.g. pooled HTTP clients)."""
+        pass
+
     def validate_params(self, params: dict[str, Any]) -> list[str]:
         """Validate tool parameters against JSON schema. Returns error list (empty if valid)."""
         schema = self.parameters or {}
@@ -2,6 +2,8 @@
 
 from typing import Any
 
+from loguru import logger
+
 from nanobot.agent.tools.base import Tool
 
 
@@ -66,6 +68,14 @@ class ToolRegistry:
         except Exception as e:
             return f"Error executing {name}: {str(e)}" + _HINT
     
+    async def aclose(self) -> None:
+        """Release resources held by registered tools."""
+        for name, tool in self._tools.items():
+            try:
+                await tool.aclose()
+            except Exception as e:
+                logger.warning("Failed to close tool {}: {}", name, e)
+    
     @property
     def tool_names(self) -> list[str]:
         """Get list of registered tool names."""
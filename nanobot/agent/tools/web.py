@@ -1,46 +1,285 @@
 """Web tools: web_search and web_fetch."""
 
+import asyncio
+import functools
 import html
 import json
 import os
 import re
+import time
+import weakref
+from collections import OrderedDict
+from html.parser import HTMLParser
 from typing import Any
-from urllib.parse import urlparse
+from urllib.parse import urlsplit
 
 import httpx
 
 from nanobot.agent.tools.base import Tool
 
+try:
+    from readability import Document
+except ImportError:
+    Document = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # Shared constants
 USER_AGENT = "Mozilla/5.0 (Macintosh; Intel Mac OS X 14_7_2) AppleWebKit/537.36"
 MAX_REDIRECTS = 5  # Limit redirects to prevent DoS attacks
+ALLOWED_SCHEMES = frozenset(("http", "https"))
+HTTP_LIMITS = httpx.Limits(max_connections=20, max_keepalive_connections=5, keepalive_expiry=5.0)
+SEARCH_CACHE_TTL = 300.0  # Seconds a formatted search result stays fresh
+SEARCH_CACHE_SIZE = 256
+
+# (tool name, query, count) -> (timestamp, formatted result)
+_SEARCH_CACHE: OrderedDict[tuple[str, str, int], tuple[float, str]] = OrderedDict()
+
+# id(event loop) -> (weak ref to that loop, pooled client bound to it)
+_CLIENTS: dict[int, tuple[weakref.ref, httpx.AsyncClient]] = {}
+
+# Precompiled patterns for the HTML extraction hot path
+_BLOCK_START_RE = {
+    "<script": re.compile(r'<script', re.I),
+    "<style": re.compile(r'<style', re.I),
+}
+_BLOCK_END_RE = {
+    "<script": re.compile(r'</script>', re.I),
+    "<style": re.compile(r'</style>', re.I),
+}
+_WS_RE = re.compile(r'[ \t]+')
+_NL_RE = re.compile(r'\n{3,}')
+_BLOCK_CLOSE_RE = re.compile(r'</(?:p|div)>', re.I)
+_DOMAIN_END_RE = re.compile(r'[/?#]')
+# Leading C0 controls and spaces are stripped like urlsplit does (WHATWG URL rules)
+_URL_LSTRIP = "".join(map(chr, range(0x21)))
+
+
+def _json_dumps(obj: Any, indent: bool = False) -> str:
+    """Serialize to JSON (non-ASCII kept as-is), using orjson when installed."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0).decode()
+        except orjson.JSONEncodeError:
+            pass  # e.g. integers beyond 64 bits; let the stdlib handle it
+    return json.dumps(obj, indent=2 if indent else None, ensure_ascii=False)
+
+
+def _json_loads(data: bytes | str) -> Any:
+    """Parse JSON, using orjson when installed."""
+    if orjson is not None:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            pass  # orjson is stricter (big ints, NaN); fall back to the stdlib
+    return json.loads(data)
 
 
 def _strip_tags(text: str) -> str:
-    """Remove HTML tags and decode entities."""
-    text = re.sub(r'<script[\s\S]*?</script>', '', text, flags=re.I)
-    text = re.sub(r'<style[\s\S]*?</style>', '', text, flags=re.I)
-    text = re.sub(r'<[^>]+>', '', text)
-    return html.unescape(text).strip()
+    """Remove HTML tags and decode entities.
+
+    Single left-to-right scan, so the cost stays linear even on malformed
+    or adversarial markup (unclosed tags, huge comments).
+    """
+    if '<' not in text:
+        return (html.unescape(text) if '&' in text else text).strip()
+    out: list[str] = []
+    unclosed: set[str] = set()  # block openers with no closing tag left in the text
+    pos = 0
+    while (lt := text.find('<', pos)) >= 0:
+        out.append(text[pos:lt])
+        head = text[lt:lt + 7].lower()
+        opener = "<script" if head == "<script" else "<style" if head.startswith("<style") else None
+        if opener and opener not in unclosed:
+            if end := _BLOCK_END_RE[opener].search(text, lt):
+                pos = end.end()
+                continue
+            unclosed.add(opener)
+        gt = text.find('>', lt + 1)
+        if gt < 0:
+            pos = lt  # no tag can close past this point; keep the rest as text
+            break
+        if gt == lt + 1:
+            out.append('<>')
+        pos = gt + 1
+    out.append(text[pos:])
+    text = ''.join(out)
+    return (html.unescape(text) if '&' in text else text).strip()
+
+
+def _cut_open_block(text: str) -> str:
+    """Drop a trailing <script>/<style> block left unterminated by truncating the HTML."""
+    cut = len(text)
+    for opener, end_re in _BLOCK_END_RE.items():
+        last = None
+        for last in _BLOCK_START_RE[opener].finditer(text):
+            pass
+        if last and not end_re.search(text, last.start()):
+            cut = min(cut, last.start())
+    return text[:cut]
 
 
 def _normalize(text: str) -> str:
     """Normalize whitespace."""
-    text = re.sub(r'[ \t]+', ' ', text)
-    return re.sub(r'\n{3,}', '\n\n', text).strip()
+    text = _WS_RE.sub(' ', text)
+    return _NL_RE.sub('\n\n', text).strip()
+
+
+class _MarkdownParser(HTMLParser):
+    """
+    Single-pass HTML → markdown converter for links, headings, list items and blocks.
+
+    Headings inside a link are kept as plain link text; nested list items become
+    separate bullets.
+    """
+
+    _HEADINGS = {f"h{i}": i for i in range(1, 7)}
+    _LISTS = frozenset(("ul", "ol"))
+    _BLOCKS = frozenset(("p", "div", "section", "article"))
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self._out: list[str] = []
+        # Open a/h*/li/ul/ol elements: (tag, href, captured text); their content is emitted on close
+        self._stack: list[tuple[str, str | None, list[str]]] = []
+        self._skip = 0  # Depth inside <script>/<style>
+
+    def _emit(self, text: str) -> None:
+        (self._stack[-1][2] if self._stack else self._out).append(text)
+
+    def _close_top(self) -> str:
+        """Pop the innermost open element, emit its markdown and return its tag."""
+        t, href, buf = self._stack.pop()
+        inner = "".join(buf)
+        if t == "a":
+            self._emit(f"[{inner.strip()}]({href})")
+        elif t == "li":
+            self._emit(f"\n- {inner.strip()}")
+        elif t in self._HEADINGS and not any(f[0] == "a" for f in self._stack):
+            self._emit(f"\n{'#' * self._HEADINGS[t]} {inner.strip()}\n")
+        else:
+            self._emit(inner)
+        return t
+
+    def handle_starttag(self, tag: str, attrs: list[tuple[str, str | None]]) -> None:
+        if tag in ("script", "style"):
+            self._skip += 1
+        elif tag == "a":
+            if href := dict(attrs).get("href"):
+                self._stack.append((tag, href, []))
+        elif tag == "li":
+            if self._stack and self._stack[-1][0] == "li":
+                self._close_top()  # <li> has an optional end tag; a new item closes the previous one
+            self._stack.append((tag, None, []))
+        elif tag in self._HEADINGS or tag in self._LISTS:
+            self._stack.append((tag, None, []))
+        elif tag in ("br", "hr"):
+            self._emit("\n")
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag in ("script", "style"):
+            self._skip = max(self._skip - 1, 0)
+        elif any(t == tag for t, _, _ in self._stack):
+            while self._stack and self._close_top() != tag:
+                pass
+        elif tag in self._BLOCKS:
+            self._emit("\n\n")
+
+    def handle_data(self, data: str) -> None:
+        if not self._skip:
+            self._emit(data)
 
+    def get_text(self) -> str:
+        """Return the converted text, flushing any unclosed elements as plain text."""
+        self.close()
+        while self._stack:
+            self._emit("".join(self._stack.pop()[2]))
+        return "".join(self._out)
 
+
+def _get_client() -> httpx.AsyncClient:
+    """
+    Return the pooled HTTP client shared by web tools on the running event loop.
+
+    httpx connections are bound to the loop that opened them, so each loop gets
+    its own client; entries for closed or collected loops are dropped.
+    """
+    loop = asyncio.get_running_loop()
+    key = id(loop)
+    entry = _CLIENTS.get(key)
+    if entry and entry[0]() is loop and not entry[1].is_closed:
+        return entry[1]
+    for k, (ref, _) in list(_CLIENTS.items()):
+        if (old := ref()) is None or old.is_closed():
+            # Can't be closed here: closing a transport schedules a callback on its own
+            # (now closed) loop and raises "Event loop is closed". Sockets are released
+            # when the client is garbage-collected; AgentLoop.close() closes it properly.
+            del _CLIENTS[k]
+    client = httpx.AsyncClient(max_redirects=MAX_REDIRECTS, limits=HTTP_LIMITS)
+    _CLIENTS[key] = (weakref.ref(loop, lambda _: _CLIENTS.pop(key, None)), client)
+    return client
+
+
+async def _close_client() -> None:
+    """Close the shared HTTP client of the running event loop, if any."""
+    if entry := _CLIENTS.pop(id(asyncio.get_running_loop()), None):
+        await entry[1].aclose()
+
+
+async def _read_limited(r: httpx.Response, limit: int) -> tuple[bytes, bool]:
+    """Read at most `limit` bytes of a streamed body. Returns (body, overflowed)."""
+    chunks: list[bytes] = []
+    size = 0
+    async for chunk in r.aiter_bytes():
+        chunks.append(chunk)
+        size += len(chunk)
+        if size > limit:
+            return b"".join(chunks)[:limit], True
+    return b"".join(chunks), False
+
+
+def _html_prefix(text: str, budget: int) -> str:
+    """Cut HTML to at most `budget` chars, ending after the last </p> or </div> that fits."""
+    end = None
+    for end in _BLOCK_CLOSE_RE.finditer(text, 0, budget):
+        pass
+    return text[:end.end()] if end else text[:budget]
+
+
+def _format_result(i: int, item: dict[str, Any]) -> str:
+    """Format one search result as numbered title, URL and optional description."""
+    base = f"{i}. {item.get('title', '')}\n   {item.get('url', '')}"
+    return f"{base}\n   {desc}" if (desc := item.get("description")) else base
+
+
+@functools.lru_cache(maxsize=1024)
 def _validate_url(url: str) -> tuple[bool, str]:
     """Validate URL: must be http(s) with valid domain."""
-    try:
-        p = urlparse(url)
-        if p.scheme not in ('http', 'https'):
-            return False, f"Only http/https allowed, got '{p.scheme or 'none'}'"
-        if not p.netloc:
-            return False, "Missing domain"
-        return True, ""
-    except Exception as e:
-        return False, str(e)
+    url = url.lstrip(_URL_LSTRIP)
+    if "\t" in url or "\r" in url or "\n" in url:
+        url = url.replace("\t", "").replace("\r", "").replace("\n", "")
+    colon = url.find(":")
+    scheme = url[:colon].lower() if colon > 0 else ""
+    if scheme not in ALLOWED_SCHEMES:
+        return False, f"Only http/https allowed, got '{scheme or 'none'}'"
+    if not url.startswith("//", colon + 1):
+        return False, "Missing domain"
+    # Domain runs up to the first path, query or fragment delimiter
+    start = colon + 3
+    end = m.start() if (m := _DOMAIN_END_RE.search(url, start)) else len(url)
+    if start == end:
+        return False, "Missing domain"
+    domain = url[start:end]
+    if "[" in domain or "]" in domain or not domain.isascii():
+        # IPv6 brackets and non-ASCII hosts get urlsplit's stricter netloc checks
+        try:
+            urlsplit(url)
+        except ValueError as e:
+            return False, str(e)
+    return True, ""
 
 
 class WebSearchTool(Tool):
@@ -60,6 +299,10 @@ class WebSearchTool(Tool):
     def __init__(self, api_key: str | None = None, max_results: int = 5):
         self.api_key = api_key or os.environ.get("BRAVE_API_KEY", "")
         self.max_results = max_results
+
+    async def aclose(self) -> None:
+        """Close the shared HTTP client."""
+        await _close_client()
     
     async def execute(self, query: str, count: int | None = None, **kwargs: Any) -> str:
         if not self.api_key:
@@ -67,25 +310,30 @@ class WebSearchTool(Tool):
         
         try:
             n = min(max(count or self.max_results, 1), 10)
-            async with httpx.AsyncClient() as client:
-                r = await client.get(
-                    "https://api.search.brave.com/res/v1/web/search",
-                    params={"q": query, "count": n},
-                    headers={"Accept": "application/json", "X-Subscription-Token": self.api_key},
-                    timeout=10.0
-                )
-                r.raise_for_status()
+            key = (self.name, query, n)
+            if (hit := _SEARCH_CACHE.get(key)) and time.monotonic() - hit[0] < SEARCH_CACHE_TTL:
+                return hit[1]
+
+            r = await _get_client().get(
+                "https://api.search.brave.com/res/v1/web/search",
+                params={"q": query, "count": n},
+                headers={"Accept": "application/json", "X-Subscription-Token": self.api_key},
+                timeout=10.0
+            )
+            r.raise_for_status()
             
-            results = r.json().get("web", {}).get("results", [])
+            results = _json_loads(r.content).get("web", {}).get("results", [])
             if not results:
-                return f"No results for: {query}"
-            
-            lines = [f"Results for: {query}\n"]
-            for i, item in enumerate(results[:n], 1):
-                lines.append(f"{i}. {item.get('title', '')}\n   {item.get('url', '')}")
-                if desc := item.get("description"):
-                    lines.append(f"   {desc}")
-            return "\n".join(lines)
+                result = f"No results for: {query}"
+            else:
+                body = "\n".join(_format_result(i, item) for i, item in enumerate(results[:n], 1))
+                result = f"Results for: {query}\n\n{body}"
+
+            _SEARCH_CACHE[key] = (time.monotonic(), result)
+            _SEARCH_CACHE.move_to_end(key)
+            if len(_SEARCH_CACHE) > SEARCH_CACHE_SIZE:
+                _SEARCH_CACHE.popitem(last=False)
+            return result
         except Exception as e:
             return f"Error: {e}"
 
@@ -105,59 +353,88 @@ class WebFetchTool(Tool):
         "required": ["url"]
     }
     
-    def __init__(self, max_chars: int = 50000):
+    def __init__(self, max_chars: int = 50000, fast_strip_ratio: int = 20, fast_strip_prefix_ratio: int = 4,
+                 readability_ratio: int = 10):
         self.max_chars = max_chars
+        # Pages larger than max_chars * fast_strip_ratio skip Readability and are
+        # tag-stripped from a max_chars * fast_strip_prefix_ratio prefix instead
+        self.fast_strip_ratio = fast_strip_ratio
+        self.fast_strip_prefix_ratio = fast_strip_prefix_ratio
+        # Readability only sees the first max_chars * readability_ratio chars of a page
+        self.readability_ratio = readability_ratio
+
+    async def aclose(self) -> None:
+        """Close the shared HTTP client."""
+        await _close_client()
     
     async def execute(self, url: str, extractMode: str = "markdown", maxChars: int | None = None, **kwargs: Any) -> str:
-        from readability import Document
-
         max_chars = maxChars or self.max_chars
+        page_chars = max(max_chars, self.max_chars)
 
         # Validate URL before fetching
         is_valid, error_msg = _validate_url(url)
         if not is_valid:
-            return json.dumps({"error": f"URL validation failed: {error_msg}", "url": url}, ensure_ascii=False)
+            return _json_dumps({"error": f"URL validation failed: {error_msg}", "url": url})
 
         try:
-            async with httpx.AsyncClient(
-                follow_redirects=True,
-                max_redirects=MAX_REDIRECTS,
-                timeout=30.0
-            ) as client:
-                r = await client.get(url, headers={"User-Agent": USER_AGENT})
+            async with _get_client().stream(
+                "GET", url, headers={"User-Agent": USER_AGENT}, follow_redirects=True, timeout=30.0
+            ) as r:
                 r.raise_for_status()
-            
-            ctype = r.headers.get("content-type", "")
-            
+                ctype = r.headers.get("content-type", "")
+                # Only buffer what can survive truncation; skip parsing oversized bodies
+                if "application/json" in ctype:
+                    limit = max_chars * 4
+                else:
+                    # Size thresholds come from the configured max_chars; a small per-call
+                    # maxChars must not push ordinary pages off the Readability path
+                    limit = page_chars * self.fast_strip_ratio
+                    if int(r.headers.get("content-length") or 0) > limit:
+                        limit = page_chars * self.fast_strip_prefix_ratio
+                body, truncated = await _read_limited(r, limit)
+            encoding = r.encoding or "utf-8"
+            prefix = page_chars * self.fast_strip_prefix_ratio
+
             # JSON
             if "application/json" in ctype:
-                text, extractor = json.dumps(r.json(), indent=2, ensure_ascii=False), "json"
-            # HTML
-            elif "text/html" in ctype or r.text[:256].lower().startswith(("<!doctype", "<html")):
-                doc = Document(r.text)
-                content = self._to_markdown(doc.summary()) if extractMode == "markdown" else _strip_tags(doc.summary())
-                text = f"# {doc.title()}\n\n{content}" if doc.title() else content
-                extractor = "readability"
+                if truncated:
+                    text, extractor = body.decode(encoding, errors="replace"), "raw_json_truncated"
+                else:
+                    text, extractor = _json_dumps(_json_loads(body), indent=True), "json"
+            # HTML (sniffed on raw bytes so non-HTML bodies are never decoded in full)
+            elif "text/html" in ctype or body[:512].lstrip()[:9].lower().startswith((b"<!doctype", b"<html")):
+                if truncated:
+                    source = _cut_open_block(body[:prefix].decode(encoding, errors="replace"))
+                    text = _normalize(_strip_tags(source))
+                    extractor = "fast_strip"
+                elif Document is None:
+                    return _json_dumps({"error": "readability not installed. Run: pip install readability-lxml",
+                                        "url": url})
+                else:
+                    source = body.decode(encoding, errors="replace")
+                    if len(source) > (budget := page_chars * self.readability_ratio):
+                        source, truncated = _html_prefix(source, budget), True
+                    doc = Document(source)
+                    summary, title = doc.summary(), doc.title()
+                    content = self._to_markdown(summary) if extractMode == "markdown" else _strip_tags(summary)
+                    text = f"# {title}\n\n{content}" if title else content
+                    extractor = "readability"
             else:
-                text, extractor = r.text, "raw"
+                # A character takes at most 4 bytes (UTF-8/UTF-32), so this still covers max_chars
+                text, extractor = body[:max_chars * 4].decode(encoding, errors="replace"), "raw"
+                truncated = truncated or len(body) > max_chars * 4
             
-            truncated = len(text) > max_chars
-            if truncated:
+            if len(text) > max_chars:
+                truncated = True
                 text = text[:max_chars]
             
-            return json.dumps({"url": url, "finalUrl": str(r.url), "status": r.status_code,
-                              "extractor": extractor, "truncated": truncated, "length": len(text), "text": text}, ensure_ascii=False)
+            return _json_dumps({"url": url, "finalUrl": str(r.url), "status": r.status_code,
+                                "extractor": extractor, "truncated": truncated, "length": len(text), "text": text})
         except Exception as e:
-            return json.dumps({"error": str(e), "url": url}, ensure_ascii=False)
+            return _json_dumps({"error": str(e), "url": url})
     
     def _to_markdown(self, html: str) -> str:
         """Convert HTML to markdown."""
-        # Convert links, headings, lists before stripping tags
-        text = re.sub(r'<a\s+[^>]*href=["\']([^"\']+)["\'][^>]*>([\s\S]*?)</a>',
-                      lambda m: f'[{_strip_tags(m[2])}]({m[1]})', html, flags=re.I)
-        text = re.sub(r'<h([1-6])[^>]*>([\s\S]*?)</h\1>',
-                      lambda m: f'\n{"#" * int(m[1])} {_strip_tags(m[2])}\n', text, flags=re.I)
-        text = re.sub(r'<li[^>]*>([\s\S]*?)</li>', lambda m: f'\n- {_strip_tags(m[1])}', text, flags=re.I)
-        text = re.sub(r'</(p|div|section|article)>', '\n\n', text, flags=re.I)
-        text = re.sub(r'<(br|hr)\s*/?>', '\n', text, flags=re.I)
-        return _normalize(_strip_tags(text))
+        parser = _MarkdownParser()
+        parser.feed(html)
+        return _normalize(parser.get_text())
@@ -1,6 +1,7 @@
 """QQ channel implementation using botpy SDK."""
 
 import asyncio
+import importlib.util
 from collections import deque
 from typing import TYPE_CHECKING
 
@@ -11,22 +12,27 @@ from nanobot.bus.queue import MessageBus
 from nanobot.channels.base import BaseChannel
 from nanobot.config.schema import QQConfig
 
-try:
-    import botpy
-    from botpy.message import C2CMessage
-
-    QQ_AVAILABLE = True
-except ImportError:
-    QQ_AVAILABLE = False
-    botpy = None
-    C2CMessage = None
+# botpy pulls in aiohttp and friends, so only check availability here and import on start()
+QQ_AVAILABLE = importlib.util.find_spec("botpy") is not None
+botpy = None
 
 if TYPE_CHECKING:
     from botpy.message import C2CMessage
 
 
+def _load_botpy():
+    """Import botpy on first use and cache the module."""
+    global botpy
+    if botpy is None:
+        import botpy as _botpy
+
+        botpy = _botpy
+    return botpy
+
+
 def _make_bot_class(channel: "QQChannel") -> "type[botpy.Client]":
     """Create a botpy Client subclass bound to the given channel."""
+    botpy = _load_botpy()
     intents = botpy.Intents(public_messages=True, direct_message=True)
 
     class _Bot(botpy.Client):
@@ -54,7 +60,8 @@ class QQChannel(BaseChannel):
         super().__init__(config, bus)
         self.config: QQConfig = config
         self._client: "botpy.Client | None" = None
-        self._processed_ids: deque = deque(maxlen=1000)
+        self._processed_ids: deque = deque(maxlen=1000)  # FIFO eviction order
+        self._processed_set: set[str] = set()  # O(1) membership for dedup
 
     async def start(self) -> None:
         """Start the QQ bot."""
@@ -66,8 +73,13 @@ class QQChannel(BaseChannel):
             logger.error("QQ app_id and secret not configured")
             return
 
+        try:
+            BotClass = _make_bot_class(self)
+        except ImportError as e:
+            logger.error("Failed to import QQ SDK: {}", e)
+            return
+
         self._running = True
-        BotClass = _make_bot_class(self)
         self._client = BotClass()
 
         logger.info("QQ bot started (C2C private message)")
@@ -112,9 +124,12 @@ class QQChannel(BaseChannel):
         """Handle incoming message from QQ."""
         try:
             # Dedup by message ID
-            if data.id in self._processed_ids:
+            if data.id in self._processed_set:
                 return
+            if len(self._processed_ids) == self._processed_ids.maxlen:
+                self._processed_set.discard(self._processed_ids.popleft())
             self._processed_ids.append(data.id)
+            self._processed_set.add(data.id)
 
             author = data.author
             user_id = str(getattr(author, 'id', None) or getattr(author, 'user_openid', 'unknown'))
@@ -0,0 +1,336 @@
+import asyncio
+import gc
+import json
+from collections.abc import AsyncIterator
+from typing import Any
+from unittest.mock import MagicMock
+
+import httpx
+import pytest
+
+from nanobot.agent.loop import AgentLoop
+from nanobot.agent.tools import web
+from nanobot.agent.tools.registry import ToolRegistry
+from nanobot.agent.tools.web import (
+    WebFetchTool,
+    WebSearchTool,
+    _html_prefix,
+    _strip_tags,
+    _validate_url,
+)
+from nanobot.bus.queue import MessageBus
+
+
+class _FakeResponse:
+    def __init__(self, payload: dict[str, Any]) -> None:
+        self.content = json.dumps(payload).encode()
+
+    def raise_for_status(self) -> None:
+        pass
+
+
+class _FakeClient:
+    def __init__(self, payload: dict[str, Any]) -> None:
+        self.payload = payload
+        self.calls = 0
+
+    async def get(self, *args: Any, **kwargs: Any) -> _FakeResponse:
+        self.calls += 1
+        return _FakeResponse(self.payload)
+
+
+class _Chunks:
+    """Chunked response body that records how many bytes were actually pulled."""
+
+    def __init__(self, body: bytes, size: int = 1024) -> None:
+        self.body = body
+        self.size = size
+        self.sent = 0
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        while self.sent < len(self.body):
+            chunk = self.body[self.sent:self.sent + self.size]
+            self.sent += len(chunk)
+            yield chunk
+
+
+def _serve(monkeypatch, content: bytes | _Chunks, content_type: str | None = None) -> None:
+    """Route the shared web client to a mock transport returning `content`."""
+    headers = {"content-type": content_type} if content_type else {}
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, headers=headers, content=content)
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(web, "_get_client", lambda: client)
+
+
+async def _fetch(tool: WebFetchTool, **kwargs: Any) -> dict[str, Any]:
+    return json.loads(await tool.execute(url="https://example.com/page", **kwargs))
+
+
+def test_strip_tags_removes_tags_scripts_and_styles() -> None:
+    html = (
+        "<html><head><STYLE>p { color: red; }</STYLE></head>"
+        "<body><p>Hello <b>world</b> &amp; friends</p>"
+        "<script type='text/javascript'>alert('<b>x</b>')</Script></body></html>"
+    )
+    assert _strip_tags(html) == "Hello world & friends"
+
+
+def test_strip_tags_keeps_stray_angle_brackets() -> None:
+    assert _strip_tags("<b>x</b> 1 < 2") == "x 1 < 2"
+    assert _strip_tags("<i>a <> b</i>") == "a <> b"
+
+
+def test_strip_tags_unclosed_script_only_drops_opening_tag() -> None:
+    assert _strip_tags("<script>var a = 1;") == "var a = 1;"
+
+
+def test_strip_tags_is_linear_on_pathological_input() -> None:
+    text = "<script" + "<" * 50_000
+    assert _strip_tags(text).startswith("<")
+
+
+def test_to_markdown_converts_links_headings_and_lists() -> None:
+    html = (
+        "<div><h2 class='t'>Title &amp; more</h2>"
+        "<p>See <a href=\"https://example.com/?a=1&amp;b=2\">the <b>docs</b></a>.<br>Next</p>"
+        "<ul><li>One</li><li><a href='/two'>Two</a></li></ul>"
+        "<script>var x = '<p>';</script><article>End</article></div>"
+    )
+    assert WebFetchTool()._to_markdown(html) == (
+        "## Title & more\n"
+        "See [the docs](https://example.com/?a=1&b=2).\nNext\n\n"
+        "- One\n- [Two](/two)End"
+    )
+
+
+def test_to_markdown_keeps_breaks_after_unclosed_elements() -> None:
+    to_markdown = WebFetchTool()._to_markdown
+
+    assert to_markdown("<ol><li>one<li>two</ol><p>after</p><p>after2</p>") == "- one\n- twoafter\n\nafter2"
+    assert to_markdown("<p><a href='/x'>link</p><p>after</p><br>end") == "link\n\nafter\n\nend"
+
+
+def test_to_markdown_nested_markup() -> None:
+    to_markdown = WebFetchTool()._to_markdown
+
+    assert to_markdown("<a href='/x'><h2>T</h2></a>") == "[T](/x)"
+    assert to_markdown("<h2><a href='/x'>T</a></h2>") == "## [T](/x)"
+    assert to_markdown("<ul><li>a<ul><li>b</li></ul></li><li>c</li></ul>") == "- a\n- b\n- c"
+
+
+def test_to_markdown_handles_many_unclosed_anchors() -> None:
+    assert WebFetchTool()._to_markdown("<a href='/x'>t " * 3000) == " ".join(["t"] * 3000)
+
+
+@pytest.mark.parametrize(
+    ("url", "ok"),
+    [
+        ("https://example.com/path?q=1", True),
+        ("HTTP://user:pw@example.com:8080", True),
+        ("http://example.com?next=https://other", True),
+        ("  https://example.com", True),
+        ("HTTP:\n//a b", True),
+        ("http://[::1]:8080/x", True),
+        ("ftp://example.com", False),
+        ("example.com", False),
+        ("javascript:alert(1)", False),
+        ("http:example.com", False),
+        ("http://", False),
+        ("http:///path", False),
+        ("https://?q=1", False),
+        ("http://]", False),
+        ("http://[::1/x", False),
+    ],
+)
+def test_validate_url(url: str, ok: bool) -> None:
+    assert _validate_url(url)[0] is ok
+
+
+def test_validate_url_reports_actual_scheme() -> None:
+    assert _validate_url("javascript:alert(1)") == (False, "Only http/https allowed, got 'javascript'")
+    assert _validate_url("mailto:bot@example.com") == (False, "Only http/https allowed, got 'mailto'")
+    assert _validate_url("example.com/path") == (False, "Only http/https allowed, got 'none'")
+
+
+async def test_web_search_caches_results(monkeypatch) -> None:
+    monkeypatch.setattr(web, "_SEARCH_CACHE", web.OrderedDict())
+    client = _FakeClient({"web": {"results": [
+        {"title": "Nanobot", "url": "https://example.com", "description": "A bot"},
+    ]}})
+    monkeypatch.setattr(web, "_get_client", lambda: client)
+    tool = WebSearchTool(api_key="key")
+
+    first = await tool.execute(query="nanobot", count=3)
+    second = await tool.execute(query="nanobot", count=3)
+
+    assert first == second
+    assert "1. Nanobot\n   https://example.com\n   A bot" in first
+    assert client.calls == 1
+
+    await tool.execute(query="nanobot", count=4)
+    assert client.calls == 2
+
+
+def test_get_client_is_per_event_loop(monkeypatch) -> None:
+    monkeypatch.setattr(web, "_CLIENTS", {})
+
+    async def get() -> tuple[asyncio.AbstractEventLoop, httpx.AsyncClient]:
+        client = web._get_client()
+        assert web._get_client() is client
+        return asyncio.get_running_loop(), client
+
+    loop1, client1 = asyncio.run(get())
+    loop2, client2 = asyncio.run(get())
+
+    assert client2 is not client1
+    # loop1 is closed but still referenced, so only the stale-entry sweep can drop it
+    assert web._CLIENTS == {id(loop2): (web._CLIENTS[id(loop2)][0], client2)}
+
+    del loop1, loop2
+    gc.collect()
+    assert web._CLIENTS == {}  # Dropped by the weakref callback once the loop is collected
+
+
+async def test_registry_aclose_closes_shared_client(monkeypatch) -> None:
+    monkeypatch.setattr(web, "_CLIENTS", {})
+    registry = ToolRegistry()
+    registry.register(WebSearchTool(api_key="key"))
+    registry.register(WebFetchTool())
+    client = web._get_client()
+
+    await registry.aclose()
+
+    assert client.is_closed
+    assert web._CLIENTS == {}
+
+
+async def test_agent_loop_close_closes_shared_client(monkeypatch, tmp_path) -> None:
+    monkeypatch.setattr(web, "_CLIENTS", {})
+    provider = MagicMock()
+    provider.get_default_model.return_value = "test-model"
+    loop = AgentLoop(bus=MessageBus(), provider=provider, workspace=tmp_path)
+    client = web._get_client()
+
+    await loop.close()
+
+    assert client.is_closed
+    assert web._CLIENTS == {}
+
+
+async def test_web_fetch_pretty_prints_json_within_budget(monkeypatch) -> None:
+    _serve(monkeypatch, b'{"a": [1, 2]}', "application/json")
+
+    result = await _fetch(WebFetchTool())
+
+    assert result["extractor"] == "json"
+    assert result["truncated"] is False
+    assert result["text"] == json.dumps({"a": [1, 2]}, indent=2)
+
+
+async def test_web_fetch_streams_oversized_json_as_raw_text(monkeypatch) -> None:
+    body = _Chunks(b'{"items": [' + b'"xxxxxxxxxx",' * 10_000 + b'"end"]}')
+    _serve(monkeypatch, body, "application/json")
+
+    result = await _fetch(WebFetchTool(), maxChars=1000)
+
+    assert result["extractor"] == "raw_json_truncated"
+    assert result["truncated"] is True
+    assert result["text"].startswith('{"items": ["xxxxxxxxxx",')
+    assert len(result["text"]) == 1000
+    assert body.sent < len(body.body)  # stopped reading once over the byte budget
+
+
+_PAGE = (
+    b"<html><head><title>My Title</title><style>" + b"x{}" * 100 + b"</style></head>"
+    b"<body><article><h1>My Title</h1>"
+    + b"<p>Article paragraph with enough words to count as content, sentence after sentence.</p>" * 400
+    + b"</article></body></html>"
+)
+
+
+async def test_web_fetch_small_max_chars_still_uses_readability(monkeypatch) -> None:
+    _serve(monkeypatch, _PAGE, "text/html")
+
+    result = await _fetch(WebFetchTool(), maxChars=500)
+
+    assert result["extractor"] == "readability"
+    assert result["truncated"] is True
+    assert "Article paragraph" in result["text"]
+    assert len(result["text"]) == 500
+
+
+def test_html_prefix_cuts_after_last_closing_block_case_insensitively() -> None:
+    html = "<P>one</P><DIV>two</DIV><p>three</p>"
+
+    assert _html_prefix(html, 30) == "<P>one</P><DIV>two</DIV>"
+    assert _html_prefix(html, 12) == "<P>one</P>"
+    assert _html_prefix(html, 5) == "<P>on"
+    assert _html_prefix(html, 100) == html
+
+
+async def test_web_fetch_cuts_readability_input_to_budget(monkeypatch) -> None:
+    page = (
+        b"<HTML><BODY><ARTICLE>"
+        + b"<P>Article paragraph with enough words to count as content, sentence after sentence.</P>" * 150
+        + b"<P>Final paragraph past the budget.</P></ARTICLE></BODY></HTML>"
+    )
+    _serve(monkeypatch, page, "text/html")
+
+    result = await _fetch(WebFetchTool(max_chars=1000))
+
+    assert result["extractor"] == "readability"
+    assert result["truncated"] is True
+    assert "Article paragraph" in result["text"]
+    assert "Final paragraph" not in result["text"]
+
+
+async def test_web_fetch_fast_strips_oversized_content_length(monkeypatch) -> None:
+    _serve(monkeypatch, _PAGE, "text/html")
+
+    result = await _fetch(WebFetchTool(max_chars=1000))
+
+    assert result["extractor"] == "fast_strip"
+    assert result["truncated"] is True
+    assert result["text"].startswith("My TitleMy TitleArticle paragraph")
+
+
+async def test_web_fetch_fast_strips_oversized_chunked_body(monkeypatch) -> None:
+    body = _Chunks(_PAGE)
+    _serve(monkeypatch, body, "text/html")
+
+    result = await _fetch(WebFetchTool(max_chars=1000))
+
+    assert result["extractor"] == "fast_strip"
+    assert result["truncated"] is True
+    assert body.sent < len(_PAGE)
+
+
+async def test_web_fetch_fast_strip_drops_script_cut_by_prefix(monkeypatch) -> None:
+    page = b"<html><body><p>ok</p><script>var secret=1; // " + b"x" * 30_000 + b"</script></body></html>"
+    _serve(monkeypatch, page, "text/html")
+
+    result = await _fetch(WebFetchTool(max_chars=1000))
+
+    assert result["extractor"] == "fast_strip"
+    assert result["text"] == "ok"
+
+
+async def test_web_fetch_sniffs_html_without_content_type(monkeypatch) -> None:
+    _serve(monkeypatch, b"\n  <!DOCTYPE html>" + _PAGE)
+
+    result = await _fetch(WebFetchTool())
+
+    assert result["extractor"] == "readability"
+    assert result["text"].startswith("# My Title")
+
+
+async def test_web_fetch_returns_unsniffed_body_as_raw_text(monkeypatch) -> None:
+    _serve(monkeypatch, b"plain <html> mentioned later")
+
+    result = await _fetch(WebFetchTool())
+
+    assert result["extractor"] == "raw"
+    assert result["text"] == "plain <html> mentioned later"